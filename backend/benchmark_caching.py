@@ -0,0 +1,233 @@
+"""Benchmark conditional GET and response compression on profile and history.
+
+Usage:
+    python benchmark_caching.py            # against MONGO_URL (a real mongod)
+    python benchmark_caching.py --mock     # in-memory mongomock-motor
+
+--mock needs the dev requirements (pip install -r requirements-dev.txt).
+
+The benchmark writes to a separate "<db>_benchmark" database and drops it
+afterwards. With --mock no database round-trips happen, so the latency
+numbers it prints only show in-process overhead. Against a real mongod it
+also checks with explain() that the version lookups are covered by indexes.
+
+Payloads are generated from a fixed seed:
+- profile: 60 KB picture and 150 KB CV PDF (compressed binary, so
+  incompressible once base64 encoded) plus about 10 KB of extracted CV text
+- history: 20 analyses of 5 career paths with 6 roadmap steps each
+
+Text is sampled from the standard library's docstrings. That vocabulary
+is wider than real Gemini output, so the compression ratios are conservative.
+"""
+from datetime import timedelta
+import argparse
+import base64
+import gzip
+import json
+import pydoc
+import random
+import re
+import statistics
+import sys
+import time
+
+import database
+
+SEED = 26
+REPETITIONS = 50
+
+def build_corpus():
+    modules = ["json", "os", "re", "statistics", "asyncio", "email", "http", "logging",
+               "argparse", "datetime", "decimal", "collections", "itertools", "pathlib",
+               "typing", "inspect", "unittest", "subprocess", "threading", "socket",
+               "tarfile", "zipfile", "urllib.request", "xml.dom.minidom", "functools",
+               "configparser", "csv", "sqlite3", "shutil", "tempfile", "textwrap", "ssl",
+               "mailbox", "difflib", "pickle", "enum", "dataclasses", "contextlib", "random",
+               "fractions", "calendar", "optparse", "pdb", "shlex", "ipaddress", "selectors",
+               "queue", "hashlib", "codecs", "io", "traceback", "warnings", "pprint", "ast",
+               "tokenize", "importlib", "timeit", "concurrent.futures", "multiprocessing"]
+    docs = []
+    for name in modules:
+        module = __import__(name, fromlist=["_"])
+        docs.append(pydoc.getdoc(module))
+        for member in vars(module).values():
+            if not callable(member) or not str(getattr(member, "__module__", "")).startswith(name):
+                continue
+            docs.append(pydoc.getdoc(member))
+            if isinstance(member, type):
+                docs.extend(pydoc.getdoc(attr) for attr in vars(member).values() if callable(attr))
+    text = " ".join(" ".join(docs).split())
+    sentences = {s.strip() for s in re.split(r"(?<=[.!?])\s+", text)}
+    return sorted(s for s in sentences if 40 <= len(s) <= 240)
+
+def build_payloads(rng: random.Random, corpus):
+    # Draw sentences without replacement so no analysis repeats another's prose
+    pool = list(corpus)
+    rng.shuffle(pool)
+
+    def sentence():
+        return pool.pop()
+
+    def text(n):
+        return " ".join(sentence() for _ in range(n))
+
+    def career_path():
+        return {
+            "career_path": sentence()[:40],
+            "suitability_reason": text(3),
+            "required_skills": [sentence()[:30] for _ in range(8)],
+            "roadmap": [
+                {"step": i + 1, "action": sentence()[:50], "details": text(2)}
+                for i in range(6)
+            ],
+        }
+
+    profile = {
+        "name": "Alex Morgan",
+        "degree": "BSc Computer Science",
+        "qualifications": text(2),
+        "skills": text(1),
+        "gemini_api_key": "A" * 39,
+        "profile_picture_base64": base64.b64encode(rng.randbytes(60_000)).decode(),
+        "cv_pdf_base64": base64.b64encode(rng.randbytes(150_000)).decode(),
+        "cv_text": text(60),
+    }
+    analyses = [json.dumps([career_path() for _ in range(5)]) for _ in range(20)]
+    return profile, analyses
+
+def compression_table(label: str, body: bytes):
+    import brotli
+
+    rows = []
+    for name, compress in [
+        ("gzip-6", lambda b: gzip.compress(b, 6)),
+        ("gzip-9", lambda b: gzip.compress(b, 9)),
+        ("br-4", lambda b: brotli.compress(b, quality=4)),
+        ("br-5", lambda b: brotli.compress(b, quality=5)),
+        ("br-6", lambda b: brotli.compress(b, quality=6)),
+        ("br-7", lambda b: brotli.compress(b, quality=7)),
+    ]:
+        times = []
+        for _ in range(10):
+            start = time.perf_counter()
+            out = compress(body)
+            times.append(time.perf_counter() - start)
+        rows.append((name, len(out), statistics.median(times) * 1000))
+
+    print(f"\n{label}: {len(body):,} B uncompressed")
+    for name, size, ms in rows:
+        print(f"  {name:7} {size:>9,} B  {size / len(body):6.1%}  {ms:7.2f} ms")
+
+def collect_stages(node, stages):
+    if isinstance(node, dict):
+        if "stage" in node:
+            stages.add(node["stage"])
+        for value in node.values():
+            collect_stages(value, stages)
+    elif isinstance(node, list):
+        for value in node:
+            collect_stages(value, stages)
+    return stages
+
+async def check_covered(db, user_id: str):
+    profile_plan = await db.command({
+        "explain": {
+            "find": "profiles",
+            "filter": {"user_id": user_id},
+            "projection": {"_id": 0, "version": 1},
+            "hint": {"user_id": 1, "version": 1},
+            "limit": 1,
+        },
+        "verbosity": "queryPlanner",
+    })
+    analyses_plan = await db.command({
+        "explain": {
+            "aggregate": "career_analyses",
+            "pipeline": [
+                {"$match": {"user_id": user_id}},
+                {"$group": {"_id": None, "count": {"$sum": 1}, "latest": {"$max": "$created_at"}}},
+            ],
+            "cursor": {},
+        },
+        "verbosity": "queryPlanner",
+    })
+    for name, plan in [("ProfileDB.find_version", profile_plan),
+                       ("CareerAnalysisDB.find_version", analyses_plan)]:
+        stages = collect_stages(plan, set())
+        covered = "FETCH" not in stages and "COLLSCAN" not in stages
+        print(f"  {name}: {'covered' if covered else 'NOT covered'} {sorted(stages)}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--mock", action="store_true", help="use mongomock-motor instead of MONGO_URL")
+    args = parser.parse_args()
+
+    if args.mock:
+        from mongomock_motor import AsyncMongoMockClient
+        mock_db = AsyncMongoMockClient()["career_compass_benchmark"]
+        database.get_database = lambda: mock_db
+    else:
+        base, _, rest = database.MONGO_URL.rpartition("/")
+        db_name, sep, options = rest.partition("?")
+        database.MONGO_URL = f"{base}/{db_name or 'OrbitAI'}_benchmark{sep}{options}"
+
+    from fastapi.testclient import TestClient
+    from auth import create_access_token
+    import server
+
+    rng = random.Random(SEED)
+    profile, analyses = build_payloads(rng, build_corpus())
+    backend = "mongomock (latency is in-process only)" if args.mock else database.MONGO_URL
+
+    with TestClient(server.app) as client:
+        async def seed():
+            user = await database.UserDB.create_user("benchmark@example.com", "not-a-real-hash")
+            await database.ProfileDB.create_profile(user["user_id"])
+            await database.ProfileDB.update_profile(user["user_id"], dict(profile))
+            for analysis in analyses:
+                await database.CareerAnalysisDB.create_analysis(user["user_id"], analysis)
+            return user
+
+        user = client.portal.call(seed)
+        token = create_access_token({"sub": user["email"]}, timedelta(minutes=10))
+        auth = {"Authorization": f"Bearer {token}"}
+
+        def timed(path, headers):
+            times = []
+            for _ in range(REPETITIONS):
+                start = time.perf_counter()
+                response = client.get(path, headers={**auth, **headers})
+                times.append(time.perf_counter() - start)
+            return response, statistics.median(times) * 1000
+
+        try:
+            print(f"Backend: {backend}")
+            for path in ("/api/profile", "/api/analyses"):
+                full, full_ms = timed(path, {"Accept-Encoding": "identity"})
+                etag = full.headers["etag"]
+                gz, gz_ms = timed(path, {"Accept-Encoding": "gzip"})
+                br, br_ms = timed(path, {"Accept-Encoding": "br"})
+                browser, browser_ms = timed(path, {"Accept-Encoding": "gzip, deflate, br, zstd"})
+                not_modified, nm_ms = timed(path, {"If-None-Match": etag})
+                assert not_modified.status_code == 304 and not_modified.content == b""
+
+                compression_table(path, full.content)
+                print(f"  through the app (median of {REPETITIONS}):")
+                print(f"    200 identity  {full_ms:7.2f} ms")
+                print(f"    200 gzip      {gz_ms:7.2f} ms  ({gz.headers.get('content-encoding')})")
+                print(f"    200 br        {br_ms:7.2f} ms  ({br.headers.get('content-encoding')})")
+                print(f"    200 browser   {browser_ms:7.2f} ms  ({browser.headers.get('content-encoding')})")
+                print(f"    304           {nm_ms:7.2f} ms  (0 B body)")
+
+            if not args.mock:
+                print("\nexplain():")
+                client.portal.call(check_covered, database.get_database(), user["user_id"])
+        finally:
+            if not args.mock:
+                async def drop():
+                    db = database.get_database()
+                    await db.client.drop_database(db.name)
+                client.portal.call(drop)
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,53 @@
+from fastapi import Request, Response
+from datetime import datetime
+from typing import Optional
+import hashlib
+
+# Bump whenever the JSON shape of a cached response changes, so clients
+# holding a body in the old shape stop getting 304s for it
+ETAG_SCHEMA = "1"
+
+# Responses are per-user and must be revalidated on every use. Sent on
+# both the 200 and the 304; the 200 may be compressed, so the 304 must
+# vary on Accept-Encoding as well
+CACHE_HEADERS = {
+    "Cache-Control": "private, no-cache",
+    "Vary": "Authorization, Accept-Encoding",
+}
+
+def _format_version(value: Optional[datetime]) -> str:
+    # MongoDB stores datetimes with millisecond precision, so truncate to match
+    # the value read back from the database
+    if value is None:
+        return "none"
+    return value.isoformat(timespec="milliseconds")
+
+def make_etag(kind: str, user_id: str, *version) -> str:
+    """Build a weak ETag from the schema, a resource kind, its owner and its version fields"""
+    parts = [ETAG_SCHEMA, kind, user_id] + [
+        _format_version(v) if isinstance(v, datetime) or v is None else str(v)
+        for v in version
+    ]
+    digest = hashlib.sha256(":".join(parts).encode()).hexdigest()[:32]
+    # Weak because the representation bytes differ between gzip, br and identity
+    return f'W/"{digest}"'
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """Weak comparison of the If-None-Match header against etag"""
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    for candidate in if_none_match.split(","):
+        if candidate.strip().removeprefix("W/") == opaque:
+            return True
+    return False
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag, **CACHE_HEADERS})
+
+def set_cache_headers(response: Response, etag: str):
+    response.headers["ETag"] = etag
+    response.headers.update(CACHE_HEADERS)
@@ -0,0 +1,159 @@
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.middleware.gzip import GZipResponder
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+import os
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; fall back to gzip only
+    brotli = None
+
+COMPRESSION_MINIMUM_SIZE = int(os.getenv("COMPRESSION_MINIMUM_SIZE", "500"))
+GZIP_COMPRESSION_LEVEL = int(os.getenv("GZIP_COMPRESSION_LEVEL", "6"))
+BROTLI_QUALITY = int(os.getenv("BROTLI_QUALITY", "6"))
+
+def _parse_accept_encoding(accept_encoding: str) -> dict:
+    """Map each content-coding in an Accept-Encoding header to its q-value"""
+    codings = {}
+    for item in accept_encoding.split(","):
+        name, *params = item.split(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        q = 1.0
+        for param in params:
+            key, _, value = param.partition("=")
+            if key.strip().lower() == "q":
+                try:
+                    q = float(value.strip())
+                except ValueError:
+                    q = 0.0
+        codings[name] = q
+    return codings
+
+def _choose_encoding(accept_encoding: str):
+    """Pick the client's highest-q coding we support; brotli wins a tie"""
+    codings = _parse_accept_encoding(accept_encoding)
+    supported = ["br", "gzip"] if brotli is not None else ["gzip"]
+    best, best_q = None, 0.0
+    for coding in supported:
+        q = codings.get(coding, codings.get("*", 0.0))
+        if q > best_q:
+            best, best_q = coding, q
+    return best
+
+def _unique_vary(send: Send) -> Send:
+    """Wrap send so responders adding Accept-Encoding to Vary do not repeat it"""
+    async def send_with_unique_vary(message: Message) -> None:
+        if message["type"] == "http.response.start":
+            headers = MutableHeaders(raw=message["headers"])
+            if "vary" in headers:
+                fields = []
+                for field in headers["vary"].split(","):
+                    field = field.strip()
+                    if field and field.lower() not in (f.lower() for f in fields):
+                        fields.append(field)
+                headers["vary"] = ", ".join(fields)
+        await send(message)
+    return send_with_unique_vary
+
+class CompressionMiddleware:
+    """Compress responses with brotli or gzip, following the client's q-values.
+
+    Brotli is preferred when both are equally acceptable: at the default
+    quality it produces smaller bodies than gzip for less CPU on our
+    payloads (see benchmark_caching.py). Bodies smaller than minimum_size
+    are sent uncompressed.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: int = COMPRESSION_MINIMUM_SIZE,
+        gzip_level: int = GZIP_COMPRESSION_LEVEL,
+        brotli_quality: int = BROTLI_QUALITY,
+    ) -> None:
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] == "http":
+            encoding = _choose_encoding(Headers(scope=scope).get("Accept-Encoding", ""))
+            if encoding == "br":
+                responder = BrotliResponder(self.app, self.minimum_size, self.brotli_quality)
+                await responder(scope, receive, _unique_vary(send))
+                return
+            if encoding == "gzip":
+                responder = GZipResponder(self.app, self.minimum_size, compresslevel=self.gzip_level)
+                await responder(scope, receive, _unique_vary(send))
+                return
+        await self.app(scope, receive, send)
+
+class BrotliResponder:
+    """Brotli counterpart of starlette's GZipResponder"""
+
+    def __init__(self, app: ASGIApp, minimum_size: int, quality: int) -> None:
+        self.app = app
+        self.minimum_size = minimum_size
+        self.quality = quality
+        self.send: Send = None
+        self.initial_message: Message = {}
+        self.started = False
+        self.content_encoding_set = False
+        self.compressor = None
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        self.send = send
+        await self.app(scope, receive, self.send_with_brotli)
+
+    def _start_compressed(self) -> None:
+        headers = MutableHeaders(raw=self.initial_message["headers"])
+        headers["Content-Encoding"] = "br"
+        headers.add_vary_header("Accept-Encoding")
+        del headers["Content-Length"]
+        self.compressor = brotli.Compressor(quality=self.quality)
+
+    async def send_with_brotli(self, message: Message) -> None:
+        message_type = message["type"]
+        if message_type == "http.response.start":
+            # Hold the start message until the body tells us whether to compress
+            self.initial_message = message
+            headers = Headers(raw=self.initial_message["headers"])
+            self.content_encoding_set = "content-encoding" in headers
+        elif message_type == "http.response.body" and self.content_encoding_set:
+            if not self.started:
+                self.started = True
+                await self.send(self.initial_message)
+            await self.send(message)
+        elif message_type == "http.response.body" and not self.started:
+            self.started = True
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if len(body) < self.minimum_size and not more_body:
+                await self.send(self.initial_message)
+                await self.send(message)
+                return
+
+            self._start_compressed()
+            if more_body:
+                message["body"] = self.compressor.process(body) + self.compressor.flush()
+            else:
+                message["body"] = self.compressor.process(body) + self.compressor.finish()
+                headers = MutableHeaders(raw=self.initial_message["headers"])
+                headers["Content-Length"] = str(len(message["body"]))
+            await self.send(self.initial_message)
+            await self.send(message)
+        elif message_type == "http.response.body":
+            body = message.get("body", b"")
+            if self.compressor is None:
+                await self.send(message)
+                return
+            if message.get("more_body", False):
+                message["body"] = self.compressor.process(body) + self.compressor.flush()
+            else:
+                message["body"] = self.compressor.process(body) + self.compressor.finish()
+            await self.send(message)
+        else:
+            await self.send(message)
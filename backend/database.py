@@ -8,6 +8,9 @@ load_dotenv()
 
 MONGO_URL = os.getenv("MONGO_URL", "mongodb://localhost:27017/career_compass")
 
+# Most analyses returned by CareerAnalysisDB.find_by_user_id
+ANALYSIS_HISTORY_LIMIT = 100
+
 # Global database client
 client = None
 db = None
@@ -33,8 +36,13 @@ async def init_db():
     await database.users.create_index("email", unique=True)
     await database.users.create_index("user_id", unique=True)
     await database.profiles.create_index("user_id", unique=True)
-    await database.career_analyses.create_index("user_id")
+    # Intended to let ProfileDB.find_version read the version without fetching the
+    # profile document; check with benchmark_caching.py against a real mongod
+    await database.profiles.create_index([("user_id", 1), ("version", 1)])
     await database.career_analyses.create_index("created_at")
+    # For the per-user history sort and CareerAnalysisDB.find_version's aggregate;
+    # it also serves user_id-only queries, so no separate user_id index is needed
+    await database.career_analyses.create_index([("user_id", 1), ("created_at", -1)])
     
     print("MongoDB indexes created successfully")
 
@@ -79,6 +87,7 @@ class ProfileDB:
             "profile_picture_base64": None,
             "cv_pdf_base64": None,
             "cv_text": None,
+            "version": 0,
             "updated_at": datetime.utcnow()
         }
         await db.profiles.insert_one(profile_doc)
@@ -89,13 +98,28 @@ class ProfileDB:
         db = get_database()
         return await db.profiles.find_one({"user_id": user_id})
     
+    @staticmethod
+    async def find_version(user_id: str):
+        """Return (found, version) of a profile, projecting only the version"""
+        db = get_database()
+        cursor = db.profiles.find(
+            {"user_id": user_id},
+            {"_id": 0, "version": 1}
+        ).hint([("user_id", 1), ("version", 1)]).limit(1)
+        docs = await cursor.to_list(length=1)
+        if not docs:
+            return False, None
+        doc = docs[0]
+        # Profiles created before the version counter have no version field
+        return True, doc.get("version") or 0
+    
     @staticmethod
     async def update_profile(user_id: str, update_data: dict):
         db = get_database()
         update_data["updated_at"] = datetime.utcnow()
         result = await db.profiles.update_one(
             {"user_id": user_id},
-            {"$set": update_data}
+            {"$set": update_data, "$inc": {"version": 1}}
         )
         return result.modified_count > 0
 
@@ -116,5 +140,18 @@ class CareerAnalysisDB:
     @staticmethod
     async def find_by_user_id(user_id: str):
         db = get_database()
-        cursor = db.career_analyses.find({"user_id": user_id}).sort("created_at", -1)
-        return await cursor.to_list(length=100)
\ No newline at end of file
+        cursor = db.career_analyses.find({"user_id": user_id}).sort("created_at", -1).limit(ANALYSIS_HISTORY_LIMIT)
+        return await cursor.to_list(length=ANALYSIS_HISTORY_LIMIT)
+    
+    @staticmethod
+    async def find_version(user_id: str):
+        """Return (count, latest created_at) of a user's analyses in one aggregate"""
+        db = get_database()
+        cursor = db.career_analyses.aggregate([
+            {"$match": {"user_id": user_id}},
+            {"$group": {"_id": None, "count": {"$sum": 1}, "latest": {"$max": "$created_at"}}}
+        ])
+        result = await cursor.to_list(length=1)
+        if not result:
+            return 0, None
+        return result[0]["count"], result[0]["latest"]
\ No newline at end of file
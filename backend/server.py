@@ -1,11 +1,11 @@
-from fastapi import FastAPI, Depends, HTTPException, status
+from fastapi import FastAPI, Depends, HTTPException, Request, Response, status
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel, EmailStr
 from typing import Optional, List, Dict, Any
 from datetime import timedelta
 import json
 
-from database import init_db, UserDB, ProfileDB, CareerAnalysisDB
+from database import init_db, UserDB, ProfileDB, CareerAnalysisDB, ANALYSIS_HISTORY_LIMIT
 from auth import (
     get_password_hash,
     verify_password,
@@ -15,6 +15,8 @@ from auth import (
 )
 from pdf_parser import parse_pdf_from_base64
 from gemini_service import GeminiService
+from caching import make_etag, etag_matches, not_modified, set_cache_headers
+from compression import CompressionMiddleware
 
 app = FastAPI(title="Career Compass API")
 
@@ -25,8 +27,12 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag"],
 )
 
+# Response compression (brotli or gzip) for payloads above the size threshold
+app.add_middleware(CompressionMiddleware)
+
 # Initialize database on startup
 @app.on_event("startup")
 async def startup_event():
@@ -118,12 +124,28 @@ async def login(request: LoginRequest):
     return TokenResponse(access_token=access_token, email=user["email"])
 
 @app.get("/api/profile", response_model=ProfileResponse)
-async def get_profile(current_user: dict = Depends(get_current_user)):
+async def get_profile(
+    request: Request,
+    response: Response,
+    current_user: dict = Depends(get_current_user)
+):
+    # Answer conditional requests from the version counter alone, before loading the profile
+    if "if-none-match" in request.headers:
+        found, version = await ProfileDB.find_version(current_user["user_id"])
+        if found:
+            etag = make_etag("profile", current_user["user_id"], version)
+            if etag_matches(request, etag):
+                return not_modified(etag)
+    
     profile = await ProfileDB.find_by_user_id(current_user["user_id"])
     if not profile:
         # Create profile if it doesn't exist
         profile = await ProfileDB.create_profile(current_user["user_id"])
     
+    set_cache_headers(
+        response,
+        make_etag("profile", current_user["user_id"], profile.get("version") or 0)
+    )
     return ProfileResponse(
         name=profile.get("name"),
         degree=profile.get("degree"),
@@ -268,9 +290,27 @@ async def search_career(
         raise HTTPException(status_code=500, detail=f"Error searching career path: {str(e)}")
 
 @app.get("/api/analyses")
-async def get_analyses(current_user: dict = Depends(get_current_user)):
+async def get_analyses(
+    request: Request,
+    response: Response,
+    current_user: dict = Depends(get_current_user)
+):
+    # Analyses are append-only, so the count and latest created_at identify the history
+    if "if-none-match" in request.headers:
+        count, latest = await CareerAnalysisDB.find_version(current_user["user_id"])
+        etag = make_etag("analyses", current_user["user_id"], count, latest)
+        if etag_matches(request, etag):
+            return not_modified(etag)
+    
     analyses = await CareerAnalysisDB.find_by_user_id(current_user["user_id"])
     
+    if len(analyses) < ANALYSIS_HISTORY_LIMIT:
+        count = len(analyses)
+        latest = analyses[0].get("created_at") if analyses else None
+    else:
+        # The history is truncated, so only the aggregate knows the full count
+        count, latest = await CareerAnalysisDB.find_version(current_user["user_id"])
+    set_cache_headers(response, make_etag("analyses", current_user["user_id"], count, latest))
     return {
         "analyses": [
             {
@@ -0,0 +1,264 @@
+"""Tests for conditional GET (caching.py) and response compression (compression.py).
+
+Run from backend/ with the dev requirements installed:
+    pip install -r requirements-dev.txt
+    python -m pytest -q
+"""
+from datetime import timedelta
+import gzip
+
+import anyio
+import brotli
+import pytest
+from fastapi.testclient import TestClient
+from mongomock_motor import AsyncMongoMockClient
+from starlette.requests import Request
+from starlette.responses import Response, StreamingResponse
+
+import caching
+import compression
+import database
+import server
+from auth import create_access_token
+from caching import etag_matches, make_etag
+from compression import CompressionMiddleware, _choose_encoding, _parse_accept_encoding
+
+BIG_TEXT = b"career roadmap step details " * 100
+
+def make_request(**headers) -> Request:
+    raw = [(k.replace("_", "-").encode(), v.encode()) for k, v in headers.items()]
+    return Request({"type": "http", "headers": raw})
+
+async def run_asgi(app, accept_encoding: str):
+    """Call an ASGI app directly and return the messages it sends"""
+    scope = {
+        "type": "http",
+        "method": "GET",
+        "path": "/",
+        "headers": [(b"accept-encoding", accept_encoding.encode())],
+    }
+    messages = []
+    requested = False
+
+    async def receive():
+        # Deliver the request once, then wait like a client that stays connected
+        nonlocal requested
+        if requested:
+            await anyio.Event().wait()
+        requested = True
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        messages.append(message)
+
+    await app(scope, receive, send)
+    return messages
+
+def response_headers(messages) -> dict:
+    return {k.decode(): v.decode() for k, v in messages[0]["headers"]}
+
+# Accept-Encoding parsing
+
+@pytest.mark.parametrize("header, expected", [
+    ("gzip, br", {"gzip": 1.0, "br": 1.0}),
+    ("br;q=0.5, gzip;q=0.", {"br": 0.5, "gzip": 0.0}),
+    ("br; level=1; q=0", {"br": 0.0}),
+    ("BR;Q=0.25", {"br": 0.25}),
+    ("gzip;q=abc", {"gzip": 0.0}),
+    (" , *;q=0.1", {"*": 0.1}),
+    ("", {}),
+])
+def test_parse_accept_encoding(header, expected):
+    assert _parse_accept_encoding(header) == expected
+
+@pytest.mark.parametrize("header, expected", [
+    ("gzip, deflate, br, zstd", "br"),
+    ("gzip;q=1, br;q=0.5", "gzip"),
+    ("br;q=0., gzip", "gzip"),
+    ("br; level=1; q=0, gzip;q=0.1", "gzip"),
+    ("*", "br"),
+    ("*;q=0.5, gzip", "gzip"),
+    ("gzip;q=0, *", "br"),
+    ("*;q=0", None),
+    ("identity", None),
+    ("", None),
+])
+def test_choose_encoding(header, expected):
+    assert _choose_encoding(header) == expected
+
+def test_choose_encoding_without_brotli(monkeypatch):
+    monkeypatch.setattr(compression, "brotli", None)
+    assert _choose_encoding("gzip, br") == "gzip"
+    assert _choose_encoding("br") is None
+
+# Compression middleware
+
+@pytest.mark.anyio
+async def test_brotli_single_body():
+    app = CompressionMiddleware(Response(BIG_TEXT), minimum_size=500)
+    messages = await run_asgi(app, "br")
+    headers = response_headers(messages)
+    assert headers["content-encoding"] == "br"
+    assert headers["vary"] == "Accept-Encoding"
+    assert int(headers["content-length"]) == len(messages[1]["body"])
+    assert brotli.decompress(messages[1]["body"]) == BIG_TEXT
+
+@pytest.mark.anyio
+async def test_brotli_streaming_flushes_each_chunk():
+    chunks = [BIG_TEXT, b"second chunk", b"", b"last chunk"]
+
+    async def stream():
+        for chunk in chunks:
+            yield chunk
+
+    app = CompressionMiddleware(StreamingResponse(stream()), minimum_size=500)
+    messages = await run_asgi(app, "br")
+    assert response_headers(messages)["content-encoding"] == "br"
+    assert "content-length" not in response_headers(messages)
+
+    # Every chunk must be decodable as soon as it arrives
+    decompressor = brotli.Decompressor()
+    bodies = [m for m in messages[1:] if m["type"] == "http.response.body"]
+    received = b""
+    for message, chunk in zip(bodies, chunks):
+        received += decompressor.process(message["body"])
+        assert received.endswith(chunk)
+    # The closing empty message finishes the stream
+    for message in bodies[len(chunks):]:
+        received += decompressor.process(message["body"])
+    assert received == b"".join(chunks)
+    assert decompressor.is_finished()
+
+@pytest.mark.anyio
+async def test_small_body_is_not_compressed():
+    app = CompressionMiddleware(Response(b"tiny"), minimum_size=500)
+    messages = await run_asgi(app, "br, gzip")
+    assert "content-encoding" not in response_headers(messages)
+    assert messages[1]["body"] == b"tiny"
+
+@pytest.mark.anyio
+async def test_existing_content_encoding_passes_through():
+    body = brotli.compress(BIG_TEXT)
+    upstream = Response(body, headers={"Content-Encoding": "br"})
+    messages = await run_asgi(CompressionMiddleware(upstream, minimum_size=10), "br")
+    assert response_headers(messages)["content-encoding"] == "br"
+    assert messages[1]["body"] == body
+
+@pytest.mark.anyio
+async def test_gzip_when_brotli_refused():
+    app = CompressionMiddleware(Response(BIG_TEXT), minimum_size=500)
+    messages = await run_asgi(app, "br;q=0, gzip")
+    assert response_headers(messages)["content-encoding"] == "gzip"
+    assert gzip.decompress(messages[1]["body"]) == BIG_TEXT
+
+@pytest.mark.anyio
+@pytest.mark.parametrize("accept_encoding", ["br", "gzip"])
+async def test_vary_is_not_repeated(accept_encoding):
+    upstream = Response(BIG_TEXT, headers=caching.CACHE_HEADERS)
+    messages = await run_asgi(CompressionMiddleware(upstream, minimum_size=500), accept_encoding)
+    assert response_headers(messages)["vary"] == "Authorization, Accept-Encoding"
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+# ETag comparison
+
+def test_etag_matches():
+    etag = make_etag("profile", "user", 3)
+    opaque = etag.removeprefix("W/")
+    assert etag_matches(make_request(if_none_match=etag), etag)
+    assert etag_matches(make_request(if_none_match=opaque), etag)
+    assert etag_matches(make_request(if_none_match=f'"other", {etag}'), etag)
+    assert etag_matches(make_request(if_none_match=" * "), etag)
+    assert not etag_matches(make_request(if_none_match='W/"other"'), etag)
+    assert not etag_matches(make_request(), etag)
+
+def test_make_etag_depends_on_every_part(monkeypatch):
+    etag = make_etag("profile", "user", 3)
+    assert etag.startswith('W/"')
+    assert make_etag("profile", "user", 4) != etag
+    assert make_etag("profile", "other", 3) != etag
+    assert make_etag("analyses", "user", 3) != etag
+    monkeypatch.setattr(caching, "ETAG_SCHEMA", "next")
+    assert make_etag("profile", "user", 3) != etag
+
+# Endpoints against mongomock-motor
+
+@pytest.fixture
+def client(monkeypatch):
+    mock_db = AsyncMongoMockClient()["career_compass_test"]
+    monkeypatch.setattr(database, "get_database", lambda: mock_db)
+    with TestClient(server.app) as client:
+        user = client.portal.call(database.UserDB.create_user, "user@example.com", "hash")
+        token = create_access_token({"sub": user["email"]}, timedelta(minutes=5))
+        client.headers["Authorization"] = f"Bearer {token}"
+        client.user_id = user["user_id"]
+        yield client
+
+def test_profile_not_modified(client):
+    response = client.get("/api/profile")
+    etag = response.headers["etag"]
+    assert response.headers["vary"] == "Authorization, Accept-Encoding"
+
+    response = client.get("/api/profile", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.content == b""
+    assert response.headers["etag"] == etag
+    assert response.headers["vary"] == "Authorization, Accept-Encoding"
+
+def test_profile_updates_in_same_millisecond_change_etag(client):
+    etag = client.get("/api/profile").headers["etag"]
+    client.portal.call(database.ProfileDB.update_profile, client.user_id, {"name": "A"})
+    client.portal.call(database.ProfileDB.update_profile, client.user_id, {"name": "B"})
+
+    response = client.get("/api/profile", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.json()["name"] == "B"
+    assert response.headers["etag"] != etag
+
+def test_profile_without_version_field(client):
+    client.get("/api/profile")
+    db = database.get_database()
+    client.portal.call(db.profiles.update_one, {"user_id": client.user_id}, {"$unset": {"version": ""}})
+
+    etag = client.get("/api/profile").headers["etag"]
+    assert client.get("/api/profile", headers={"If-None-Match": etag}).status_code == 304
+
+def test_schema_bump_invalidates_etag(client, monkeypatch):
+    etag = client.get("/api/profile").headers["etag"]
+    monkeypatch.setattr(caching, "ETAG_SCHEMA", "next")
+    assert client.get("/api/profile", headers={"If-None-Match": etag}).status_code == 200
+
+def test_analyses_not_modified_until_new_analysis(client):
+    for _ in range(2):
+        client.portal.call(database.CareerAnalysisDB.create_analysis, client.user_id, "[]")
+    etag = client.get("/api/analyses").headers["etag"]
+    assert client.get("/api/analyses", headers={"If-None-Match": etag}).status_code == 304
+
+    client.portal.call(database.CareerAnalysisDB.create_analysis, client.user_id, "[]")
+    response = client.get("/api/analyses", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert len(response.json()["analyses"]) == 3
+
+def test_analyses_etag_with_truncated_history(client, monkeypatch):
+    monkeypatch.setattr(database, "ANALYSIS_HISTORY_LIMIT", 2)
+    monkeypatch.setattr(server, "ANALYSIS_HISTORY_LIMIT", 2)
+    for _ in range(3):
+        client.portal.call(database.CareerAnalysisDB.create_analysis, client.user_id, "[]")
+
+    response = client.get("/api/analyses")
+    assert len(response.json()["analyses"]) == 2
+    # The 200 ETag must match the aggregate, which counts all three analyses
+    etag = response.headers["etag"]
+    assert client.get("/api/analyses", headers={"If-None-Match": etag}).status_code == 304
+
+def test_compressed_history(client):
+    for _ in range(5):
+        client.portal.call(
+            database.CareerAnalysisDB.create_analysis, client.user_id, f'["{BIG_TEXT.decode()}"]'
+        )
+    response = client.get("/api/analyses", headers={"Accept-Encoding": "gzip, deflate, br"})
+    assert response.headers["content-encoding"] == "br"
+    assert response.headers["vary"] == "Authorization, Accept-Encoding"
+    assert len(response.json()["analyses"]) == 5